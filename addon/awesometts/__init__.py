@@ -608,15 +608,16 @@ def reviewer_hooks():
 
     # automatic playback
 
-    anki.hooks.addHook(
-        'showQuestion',
-        lambda: reviewer.card_handler('question', aqt.mw.reviewer.card),
-    )
+    def on_show_question():
+        """Passes the new question to the reviewer."""
+        reviewer.card_handler('question', aqt.mw.reviewer.card)
 
-    anki.hooks.addHook(
-        'showAnswer',
-        lambda: reviewer.card_handler('answer', aqt.mw.reviewer.card),
-    )
+    def on_show_answer():
+        """Passes the new answer to the reviewer."""
+        reviewer.card_handler('answer', aqt.mw.reviewer.card)
+
+    anki.hooks.addHook('showQuestion', on_show_question)
+    anki.hooks.addHook('showAnswer', on_show_answer)
 
     # shortcut-triggered playback
 
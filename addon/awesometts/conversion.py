@@ -67,7 +67,7 @@ def lax_bool(value):
 
     return bool(value)
 
-lax_bool.FALSE_STRINGS = ['', 'false', 'no', 'off', 'unset']
+lax_bool.FALSE_STRINGS = frozenset(['', 'false', 'no', 'off', 'unset'])
 
 
 def normalized_ascii(value):
@@ -81,9 +81,9 @@ def normalized_ascii(value):
     elif not isinstance(value, basestring):
         value = str(value)
 
-    return ''.join(char.lower()
-                   for char in value
-                   if char.isalpha() or char.isdigit())
+    return normalized_ascii.RE_NONALNUM.sub('', value).lower()
+
+normalized_ascii.RE_NONALNUM = re.compile(r'[^0-9A-Za-z]+')
 
 
 def nullable_key(value):
@@ -64,7 +64,7 @@ def key_event_combo(event):
 key_event_combo.MOD_FLAGS = [Qt.AltModifier, Qt.ControlModifier,
                              Qt.MetaModifier, Qt.ShiftModifier]
 
-key_event_combo.BLACKLIST = [
+key_event_combo.BLACKLIST = frozenset([
     Qt.Key_Alt, Qt.Key_AltGr, Qt.Key_Backspace, Qt.Key_Backtab,
     Qt.Key_CapsLock, Qt.Key_Control, Qt.Key_Dead_Abovedot,
     Qt.Key_Dead_Abovering, Qt.Key_Dead_Acute, Qt.Key_Dead_Belowdot,
@@ -78,7 +78,7 @@ key_event_combo.BLACKLIST = [
     Qt.Key_Mode_switch, Qt.Key_NumLock, Qt.Key_PageDown, Qt.Key_PageUp,
     Qt.Key_Plus, Qt.Key_Return, Qt.Key_Right, Qt.Key_ScrollLock, Qt.Key_Shift,
     Qt.Key_Space, Qt.Key_Tab, Qt.Key_Underscore, Qt.Key_Up,
-]
+])
 
 
 def key_combo_desc(combo):
@@ -18,7 +18,8 @@
 
 """Configuration dialog"""
 
-from locale import format as locale
+from functools import partial
+import locale
 import os
 import os.path
 from sys import platform
@@ -31,16 +32,95 @@ from .common import key_event_combo, key_combo_desc
 from .listviews import SubListView
 from .presets import Presets
 from .groups import Groups
+from .updater import Updater
 
 __all__ = ['Configurator']
 
+_KEYS_UNASSIGN = frozenset([QtCore.Qt.Key_Backspace, QtCore.Qt.Key_Delete])
+_KEYS_ACTIVATE = frozenset([QtCore.Qt.Key_Enter, QtCore.Qt.Key_Return])
+
+_ICON_CACHE = {}
+
+_CLOZE_TEMPLATE_OPTIONS = (
+    ('anki', "read however Anki displayed it"),
+    ('wrap', "read w/ hint wrapped in ellipses"),
+    ('ellipsize', "read as an ellipsis, ignoring hint"),
+    ('remove', "remove entirely"),
+)
+
+_CLOZE_NOTE_OPTIONS = (
+    ('anki', "read as Anki would display on a card front"),
+    ('wrap', "replace w/ hint wrapped in ellipses"),
+    ('deleted', "replace w/ deleted text"),
+    ('ellipsize', "replace w/ ellipsis, ignoring both"),
+    ('remove', "remove entirely"),
+)
+
+_STRIP_OPTIONS = (
+    ('parens', "parentheses"),
+    ('brackets', "brackets"),
+    ('braces', "braces"),
+)
+
+# help URL paths, in the same order as the tabs added by _ui_tabs()
+_TAB_SLUGS = ('playback', 'text', 'mp3s', 'windows', 'advanced')
+
+# active tabs do not display correctly on Mac OS X w/ icons
+_USE_TAB_ICONS = not platform.startswith('darwin')
+
 # all methods might need 'self' in the future, pylint:disable=R0201
 
 
+def _grouped(count):
+    """Returns count as a string w/ the locale's digit grouping."""
+
+    return locale.format("%d", count, grouping=True)
+
+
+def _icon(name):
+    """Returns the named resource icon, loading it once per session."""
+
+    try:
+        return _ICON_CACHE[name]
+    except KeyError:
+        icon = _ICON_CACHE[name] = QtGui.QIcon(':/icons/%s.png' % name)
+        return icon
+
+
+def _set_checkbox(checkbox, value):
+    """
+    Checks or unchecks the checkbox, also emitting stateChanged so that
+    any dependent widgets get updated even if the state is unchanged.
+    """
+
+    checkbox.setChecked(value)
+    checkbox.stateChanged.emit(value)
+
+
+def _set_shortcut_button(button, value):
+    """
+    Assigns the key combination value to the shortcut button, keeping
+    its description and text in sync with it.
+    """
+
+    button.atts_value = value
+    button.atts_value_desc = key_combo_desc(value)
+    button.setText(button.atts_value_desc)
+
+
+# picked once here so that _ui_tabs() need not check for every tab
+_ADD_TAB = (
+    (lambda tabs, content, icon, label: tabs.addTab(content, _icon(icon),
+                                                    label))
+    if _USE_TAB_ICONS
+    else (lambda tabs, content, icon, label: tabs.addTab(content, label))
+)
+
+
 class Configurator(Dialog):
     """Provides a dialog for configuring the add-on."""
 
-    _PROPERTY_KEYS = [
+    _PROPERTY_KEYS = frozenset([
         'automatic_answers', 'automatic_answers_errors', 'automatic_questions',
         'automatic_questions_errors', 'cache_days', 'delay_answers_onthefly',
         'delay_answers_stored_ours', 'delay_answers_stored_theirs',
@@ -57,38 +137,88 @@ class Configurator(Dialog):
         'strip_template_brackets', 'strip_template_parens', 'sub_note_cloze',
         'sub_template_cloze', 'sul_note', 'sul_template', 'throttle_sleep',
         'throttle_threshold', 'tts_key_a', 'tts_key_q', 'updates_enabled',
-    ]
-
-    _PROPERTY_WIDGETS = (Checkbox, QtGui.QComboBox, QtGui.QLineEdit,
-                         QtGui.QPushButton, QtGui.QSpinBox, QtGui.QListView)
-
-    __slots__ = ['_alerts', '_ask', '_preset_editor', '_group_editor',
-                 '_sul_compiler']
+    ])
+
+    # keyed by exact type (not isinstance) so dispatch is one dict lookup
+    _SETTERS = {
+        Checkbox: _set_checkbox,
+        QtGui.QComboBox: lambda widget, value: widget.setCurrentIndex(
+            max(widget.findData(value), 0)
+        ),
+        QtGui.QLineEdit: lambda widget, value: widget.setText(value),
+        QtGui.QPushButton: _set_shortcut_button,
+        QtGui.QSpinBox: lambda widget, value: widget.setValue(value),
+        SubListView: lambda widget, value: widget.setModel(value),
+    }
+
+    _GETTERS = {
+        Checkbox: lambda widget: widget.isChecked(),
+        QtGui.QComboBox: lambda widget: widget.itemData(widget.currentIndex()),
+        QtGui.QLineEdit: lambda widget: widget.text(),
+        QtGui.QPushButton: lambda widget: widget.atts_value,
+        QtGui.QSpinBox: lambda widget: widget.value(),
+        SubListView: lambda widget: [
+            i for i in widget.model().raw_data
+            if i['compiled'] and 'bad_replace' not in i
+        ],
+    }
+
+    __slots__ = ['_alerts', '_ask', '_cache_clearer', '_preset_editor',
+                 '_group_editor', '_shortcuts', '_sul_compiler', '_tabs',
+                 '_tab_builders', '_widgets']
 
     def __init__(self, alerts, ask, sul_compiler, *args, **kwargs):
         self._alerts = alerts
         self._ask = ask
+        self._cache_clearer = None
         self._preset_editor = None
         self._group_editor = None
         self._sul_compiler = sul_compiler
+        self._tab_builders = {}
 
         super(Configurator, self).__init__(title="Configuration",
                                            *args, **kwargs)
 
+        QtGui.QApplication.instance().aboutToQuit.connect(self._on_quit)
+
     # UI Construction ########################################################
 
     def _ui(self):
         """Returns vertical layout w/ banner, our tabs, cancel/OK."""
 
         layout = super(Configurator, self)._ui()
-        layout.addWidget(self._ui_tabs())
+        self._tabs = self._ui_tabs()
+        layout.addWidget(self._tabs)
         layout.addWidget(self._ui_buttons())
+
+        self._widgets = {}
+        self._shortcuts = []
+        self._register(self._tabs)
+
         return layout
 
+    def _register(self, root):
+        """
+        Records the named widgets under the given root so show() and
+        accept() need not call findChildren() each time, returning the
+        newly-found widgets keyed by name.
+        """
+
+        found = {
+            widget.objectName(): widget
+            for widget in root.findChildren(QtGui.QWidget)
+            if widget.objectName() and
+            not widget.objectName().startswith('qt_')
+        }
+        self._widgets.update(found)
+        self._shortcuts.extend(widget
+                               for name, widget in found.items()
+                               if name.startswith(('launch_', 'tts_key_')))
+        return found
+
     def _ui_tabs(self):
         """Returns tab widget w/ Playback, Text, MP3s, Advanced."""
 
-        use_icons = not platform.startswith('darwin')
         tabs = QtGui.QTabWidget()
 
         for content, icon, label in [
@@ -98,14 +228,19 @@ class Configurator(Dialog):
                 (self._ui_tabs_windows, 'kpersonalizer', "Windows"),
                 (self._ui_tabs_advanced, 'configure', "Advanced"),
         ]:
-            if use_icons:
-                tabs.addTab(content(), QtGui.QIcon(':/icons/%s.png' % icon),
-                            label)
-            else:  # active tabs do not display correctly on Mac OS X w/ icons
-                tabs.addTab(content(), label)
-
-        tabs.currentChanged.connect(lambda: (tabs.adjustSize(),
-                                             self.adjustSize()))
+            # only the first tab is built up front; the rest get a stand-in
+            # until the user visits them (see _on_tab_build)
+            if tabs.count():
+                self._tab_builders[tabs.count()] = content
+                content = QtGui.QWidget()
+            else:
+                content = content()
+
+            _ADD_TAB(tabs, content, icon, label)
+
+        tabs.currentChanged.connect(self._on_tab_build)
+        tabs.currentChanged.connect(tabs.adjustSize)
+        tabs.currentChanged.connect(self.adjustSize)
         return tabs
 
     def _ui_tabs_playback(self):
@@ -189,21 +324,14 @@ class Configurator(Dialog):
             '_template_',
             "Handling Template Text (e.g. On-the-Fly, Context Menus)",
             "For a front-side rendered cloze,",
-            [('anki', "read however Anki displayed it"),
-             ('wrap', "read w/ hint wrapped in ellipses"),
-             ('ellipsize', "read as an ellipsis, ignoring hint"),
-             ('remove', "remove entirely")],
+            _CLOZE_TEMPLATE_OPTIONS,
             template_options=True,
         ), 50)
         layout.addWidget(self._ui_tabs_text_mode(
             '_note_',
             "Handling Text from a Note Field (e.g. Browser Generator)",
             "For a braced cloze marker,",
-            [('anki', "read as Anki would display on a card front"),
-             ('wrap', "replace w/ hint wrapped in ellipses"),
-             ('deleted', "replace w/ deleted text"),
-             ('ellipsize', "replace w/ ellipsis, ignoring both"),
-             ('remove', "remove entirely")],
+            _CLOZE_NOTE_OPTIONS,
         ), 50)
 
         tab = QtGui.QWidget()
@@ -275,9 +403,7 @@ class Configurator(Dialog):
 
         hor = QtGui.QHBoxLayout()
         hor.addWidget(Label("Strip off text within:"))
-        for option_subkey, option_label in [('parens', "parentheses"),
-                                            ('brackets', "brackets"),
-                                            ('braces', "braces")]:
+        for option_subkey, option_label in _STRIP_OPTIONS:
             hor.addWidget(Checkbox(option_label,
                                    infix.join(['strip', option_subkey])))
         hor.addStretch()
@@ -518,8 +644,7 @@ class Configurator(Dialog):
     def _ui_tabs_advanced_update(self):
         """Returns the "Updates" input group."""
 
-        button = QtGui.QPushButton(QtGui.QIcon(':/icons/find.png'),
-                                   "Check Now")
+        button = QtGui.QPushButton(_icon('find'), "Check Now")
         button.setSizePolicy(QtGui.QSizePolicy.Fixed, QtGui.QSizePolicy.Fixed)
         button.setObjectName('updates_button')
         button.clicked.connect(self._on_update_request)
@@ -586,12 +711,14 @@ class Configurator(Dialog):
         shortcut.atts_pending = False
         shortcut.setObjectName(object_name)
         shortcut.setCheckable(True)
+        # atts_value_desc is kept current by _set_shortcut_button(), so
+        # releasing the button is just a text swap
         shortcut.toggled.connect(
             lambda is_down: (
                 shortcut.setText("press keystroke"),
                 shortcut.setFocus(),  # needed for OS X if text inputs present
             ) if is_down
-            else shortcut.setText(key_combo_desc(shortcut.atts_value))
+            else shortcut.setText(shortcut.atts_value_desc)
         )
         return shortcut
 
@@ -600,83 +727,93 @@ class Configurator(Dialog):
     def show(self, *args, **kwargs):
         """Restores state on inputs; rough opposite of the accept()."""
 
-        for widget, value in [
-                (widget, self._addon.config[widget.objectName()])
-                for widget in self.findChildren(self._PROPERTY_WIDGETS)
-                if widget.objectName() in self._PROPERTY_KEYS
-        ]:
-            if isinstance(widget, Checkbox):
-                widget.setChecked(value)
-                widget.stateChanged.emit(value)
-            elif isinstance(widget, QtGui.QLineEdit):
-                widget.setText(value)
-            elif isinstance(widget, QtGui.QPushButton):
-                widget.atts_value = value
-                widget.setText(key_combo_desc(widget.atts_value))
-            elif isinstance(widget, QtGui.QComboBox):
-                widget.setCurrentIndex(max(widget.findData(value), 0))
-            elif isinstance(widget, QtGui.QSpinBox):
-                widget.setValue(value)
-            elif isinstance(widget, QtGui.QListView):
-                widget.setModel(value)
-
-        widget = self.findChild(QtGui.QPushButton, 'on_cache')
-        widget.atts_list = (
-            [filename for filename in os.listdir(self._addon.paths.cache)]
-            if os.path.isdir(self._addon.paths.cache) else []
-        )
-        if widget.atts_list:
+        self._restore(self._widgets)
+        super(Configurator, self).show(*args, **kwargs)
+
+    def _restore(self, widgets):
+        """
+        Restores state on the given widgets, which may be a subset of
+        the dialog if some tabs have not been built yet.
+        """
+
+        config = self._addon.config
+        for name in self._PROPERTY_KEYS.intersection(widgets):
+            widget = widgets[name]
+            self._SETTERS[type(widget)](widget, config[name])
+
+        if 'on_cache' not in widgets:
+            return
+
+        widget = widgets['on_cache']
+        try:
+            widget.atts_list = os.listdir(self._addon.paths.cache)
+        except OSError:  # e.g. cache directory does not exist
+            widget.atts_list = []
+        count = len(widget.atts_list)
+        if self._cache_clearer and self._cache_clearer.isRunning():
+            widget.setEnabled(False)
+            widget.setText("emptying cache...")
+        elif count:
             widget.setEnabled(True)
-            widget.setText("Delete Files (%s)" %
-                           locale("%d", len(widget.atts_list), grouping=True))
+            widget.setText("Delete Files (%s)" % _grouped(count))
         else:
             widget.setEnabled(False)
             widget.setText("Delete Files")
 
-        widget = self.findChild(QtGui.QPushButton, 'on_forget')
+        widget = widgets['on_forget']
         fail_count = self._addon.router.get_failure_count()
         if fail_count:
             widget.setEnabled(True)
-            widget.setText("Forget Failures (%s)" %
-                           locale("%d", fail_count, grouping=True))
+            widget.setText("Forget Failures (%s)" % _grouped(fail_count))
         else:
             widget.setEnabled(False)
             widget.setText("Forget Failures")
 
-        super(Configurator, self).show(*args, **kwargs)
-
     def accept(self):
         """Saves state on inputs; rough opposite of show()."""
 
-        for list_view in self.findChildren(QtGui.QListView):
+        widgets = self._widgets
+
+        for list_view in [widgets[name]
+                          for name in ['sul_note', 'sul_template']
+                          if name in widgets]:
             for editor in list_view.findChildren(QtGui.QWidget, 'editor'):
                 list_view.commitData(editor)  # if an editor is open, save it
 
+        # tabs never visited have nothing to save, so their config stays put
         self._addon.config.update({
-            widget.objectName(): (
-                widget.isChecked() if isinstance(widget, Checkbox)
-                else widget.atts_value if isinstance(widget, QtGui.QPushButton)
-                else widget.value() if isinstance(widget, QtGui.QSpinBox)
-                else widget.itemData(widget.currentIndex()) if isinstance(
-                    widget, QtGui.QComboBox)
-                else [
-                    i for i in widget.model().raw_data
-                    if i['compiled'] and 'bad_replace' not in i
-                ] if isinstance(widget, QtGui.QListView)
-                else widget.text()
-            )
-            for widget in self.findChildren(self._PROPERTY_WIDGETS)
-            if widget.objectName() in self._PROPERTY_KEYS
+            name: self._GETTERS[type(widgets[name])](widgets[name])
+            for name in self._PROPERTY_KEYS.intersection(widgets)
         })
 
         super(Configurator, self).accept()
 
+    def _on_tab_build(self, index):
+        """Swaps the stand-in for a tab's real content on first visit."""
+
+        try:
+            content = self._tab_builders.pop(index)
+        except KeyError:  # already built
+            return
+
+        tabs = self._tabs
+        stand_in = tabs.widget(index)
+        icon = tabs.tabIcon(index)
+        label = tabs.tabText(index)
+
+        tabs.blockSignals(True)  # avoid reentry while the tab is swapped
+        tabs.removeTab(index)
+        tabs.insertTab(index, content(), icon, label)
+        tabs.setCurrentIndex(index)
+        tabs.blockSignals(False)
+        stand_in.deleteLater()
+
+        self._restore(self._register(tabs.widget(index)))
+
     def help_request(self):
         """Launch browser to the URL for the user's current tab."""
 
-        tabs = self.findChild(QtGui.QTabWidget)
-        self._launch_link('config/' +
-                          tabs.tabText(tabs.currentIndex()).lower())
+        self._launch_link('config/' + _TAB_SLUGS[self._tabs.currentIndex()])
 
     def keyPressEvent(self, key_event):  # from PyQt4, pylint:disable=C0103
         """Assign new combo for shortcut buttons undergoing changes."""
@@ -690,10 +827,10 @@ class Configurator(Dialog):
         if key == QtCore.Qt.Key_Escape:
             for button in buttons:
                 button.atts_pending = False
-                button.setText(key_combo_desc(button.atts_value))
+                button.setText(button.atts_value_desc)
             return
 
-        if key in [QtCore.Qt.Key_Backspace, QtCore.Qt.Key_Delete]:
+        if key in _KEYS_UNASSIGN:
             combo = None
         else:
             combo = key_event_combo(key_event)
@@ -711,24 +848,20 @@ class Configurator(Dialog):
         if not buttons:
             return super(Configurator, self).keyReleaseEvent(key_event)
 
-        elif key_event.key() in [QtCore.Qt.Key_Enter, QtCore.Qt.Key_Return]:
+        elif key_event.key() in _KEYS_ACTIVATE:
             # need to ignore and eat key release on enter/return so that user
             # can activate the button without immediately deactivating it
             return
 
         for button in buttons:
             if button.atts_pending is not False:
-                button.atts_value = button.atts_pending
+                _set_shortcut_button(button, button.atts_pending)
             button.setChecked(False)
 
     def _get_pressed_shortcut_buttons(self):
         """Returns all shortcut buttons that are pressed."""
 
-        return [button
-                for button in self.findChildren(QtGui.QPushButton)
-                if (button.isChecked() and
-                    (button.objectName().startswith('launch_') or
-                     button.objectName().startswith('tts_key_')))]
+        return [button for button in self._shortcuts if button.isChecked()]
 
     def _on_presets(self):
         """Opens the presets editor."""
@@ -760,52 +893,69 @@ class Configurator(Dialog):
     def _on_update_request(self):
         """Attempts update request w/ add-on updates interface."""
 
-        button = self.findChild(QtGui.QPushButton, 'updates_button')
+        button = self._widgets['updates_button']
         button.setEnabled(False)
-        state = self.findChild(Note, 'updates_state')
+        state = self._widgets['updates_state']
         state.setText("Querying update server...")
 
-        from .updater import Updater
         self._addon.updates.check(
             callbacks=dict(
-                done=lambda: button.setEnabled(True),
-                fail=lambda exception: state.setText("Check failed: %s" % (
-                    exception.message or format(exception) or
-                    "Nothing further known"
-                )),
-                good=lambda: state.setText("No update needed at this time."),
-                need=lambda version, info: (
-                    state.setText("Update to %s is available" % version),
-                    [updater.show()
-                     for updater in [Updater(
-                         version=version,
-                         info=info,
-                         is_manual=True,
-                         addon=self._addon,
-                         parent=(self if self.isVisible()
-                                 else self.parentWidget()),
-                     )]],
-                ),
+                done=partial(button.setEnabled, True),
+                fail=partial(self._on_update_fail, state),
+                good=partial(self._on_update_good, state),
+                need=partial(self._on_update_need, state),
             ),
         )
 
+    def _on_update_fail(self, state, exception):
+        """Reports a failed update check."""
+
+        state.setText("Check failed: %s" % (
+            exception.message or format(exception) or
+            "Nothing further known"
+        ))
+
+    def _on_update_good(self, state):
+        """Reports that no update is needed."""
+
+        state.setText("No update needed at this time.")
+
+    def _on_update_need(self, state, version, info):
+        """Reports an available update and shows the updater."""
+
+        state.setText("Update to %s is available" % version)
+        Updater(
+            version=version,
+            info=info,
+            is_manual=True,
+            addon=self._addon,
+            parent=self if self.isVisible() else self.parentWidget(),
+        ).show()
+
     def _on_cache_clear(self, button):
-        """Attempts clear known files from cache."""
+        """Starts clearing known files from cache in the background."""
 
         button.setEnabled(False)
-        count_error = count_success = 0
+        button.setText("emptying cache...")
 
-        for filename in button.atts_list:
-            try:
-                os.unlink(os.path.join(self._addon.paths.cache, filename))
-                count_success += 1
-            except:  # capture all exceptions, pylint:disable=W0702
-                count_error += 1
+        # keeping a reference to the worker prevents garbage collection
+        self._cache_clearer = _CacheClearer([
+            os.path.join(self._addon.paths.cache, filename)
+            for filename in button.atts_list
+        ])
+        self._cache_clearer.cleared.connect(self._on_cache_cleared,
+                                            QtCore.Qt.QueuedConnection)
+        self._cache_clearer.start()
+
+    def _on_cache_cleared(self, count_success, count_error):
+        """Reports the outcome of a background cache clearing."""
+
+        button = self._widgets['on_cache']
 
         if count_error:
             if count_success:
                 button.setText("partially emptied (%s left)" %
-                               locale("%d", count_error, grouping=True))
+                               _grouped(count_error))
             else:
                 button.setText("unable to empty")
         else:
@@ -817,3 +967,47 @@ class Configurator(Dialog):
         button.setEnabled(False)
         self._addon.router.forget_failures()
         button.setText("forgot failures")
+
+    def _on_quit(self):
+        """
+        Lets any in-progress cache clearing finish, so that its thread
+        is not destroyed while still running as the application exits.
+        """
+
+        if self._cache_clearer:
+            self._cache_clearer.wait()
+
+
+class _CacheClearer(QtCore.QThread):
+    """
+    Unlinks a list of cached files off of the main thread, so that the
+    dialog stays responsive for large caches.
+    """
+
+    # emitted with the success and error counts once done
+    cleared = QtCore.pyqtSignal(int, int)
+
+    __slots__ = [
+        '_paths',  # list of full paths to be removed
+    ]
+
+    def __init__(self, paths):
+        super(_CacheClearer, self).__init__()
+        self._paths = paths
+
+    def run(self):
+        """
+        Attempts to remove each path, then signals back the success and
+        error counts.
+        """
+
+        count_error = count_success = 0
+
+        for path in self._paths:
+            try:
+                os.unlink(path)
+                count_success += 1
+            except:  # capture all exceptions, pylint:disable=W0702
+                count_error += 1
+
+        self.cleared.emit(count_success, count_error)
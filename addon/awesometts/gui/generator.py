@@ -393,14 +393,16 @@ class BrowserGenerator(ServiceDialog):
                                      presets=config['presets'],
                                      callbacks=callbacks,
                                      want_human=want_human,
-                                     note=note)
+                                     note=note,
+                                     join_busy=True)
         else:
             self._addon.router(svc_id=svc_id,
                                text=phrase,
                                options=proc['service']['options'],
                                callbacks=callbacks,
                                want_human=want_human,
-                               note=note)
+                               note=note,
+                               join_busy=True)
 
     def _accept_next_output(self, old_value, filename):
         """
@@ -796,7 +798,8 @@ class EditorGenerator(ServiceDialog):
                                      presets=config['presets'],
                                      callbacks=callbacks,
                                      want_human=want_human,
-                                     note=self._editor.note)
+                                     note=self._editor.note,
+                                     join_busy=True)
         else:
             options = now['last_options'][now['last_service']]
             self._addon.router(svc_id=svc_id,
@@ -804,7 +807,8 @@ class EditorGenerator(ServiceDialog):
                                options=options,
                                callbacks=callbacks,
                                want_human=want_human,
-                               note=self._editor.note)
+                               note=self._editor.note,
+                               join_busy=True)
 
 
 class _Progress(Dialog):
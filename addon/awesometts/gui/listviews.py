@@ -29,16 +29,25 @@ from .common import Checkbox, HTML
 
 __all__ = ['GroupListView', 'SubListView']
 
+# returned by Qt callbacks for every row on every paint, so built only once
+_ITEM_FLAGS = (QtCore.Qt.ItemIsSelectable | QtCore.Qt.ItemIsEditable |
+               QtCore.Qt.ItemIsEnabled)
+_ITEM_SIZE = QtCore.QSize(-1, 40)
+
 # all methods might need 'self' in the future, pylint:disable=R0201
 
 
 class _ListView(QtGui.QListView):
     """Abstract list view for use throughout AwesomeTTS."""
 
-    __slots__ = ['_add_btn', '_up_btn', '_down_btn', '_del_btn']
+    __slots__ = [
+        '_add_btn', '_up_btn', '_down_btn', '_del_btn',
+        '_sorted_rows',  # selected row numbers, as of the last selection
+    ]
 
     def __init__(self, buttons, *args, **kwargs):
         super(_ListView, self).__init__(*args, **kwargs)
+        self._sorted_rows = []
 
         self._add_btn, self._up_btn, self._down_btn, self._del_btn = buttons
 
@@ -59,10 +68,10 @@ class _ListView(QtGui.QListView):
     def _on_selection(self):
         """Enable/disable buttons as selection changes."""
 
-        indexes = self.selectionModel().selectedIndexes()
-
-        some = len(indexes) > 0
-        rows = sorted(index.row() for index in indexes) if some else []
+        rows = sorted(index.row()
+                      for index in self.selectionModel().selectedIndexes())
+        some = bool(rows)
+        self._sorted_rows = rows
         contiguous = some and rows[-1] == rows[0] + len(rows) - 1
         allow_up = contiguous and rows[0] > 0
         allow_down = contiguous and rows[-1] < self.model().rowCount() - 1
@@ -91,16 +100,24 @@ class _ListView(QtGui.QListView):
     def _del_rules(self):
         """Remove the selected rule(s)."""
 
+        # group the selection into runs of adjacent rows, e.g. [1, 2, 3, 7]
+        # becomes [[1, 3], [7, 1]], so each run is one removeRows() call
+        runs = []
+        for row in self._sorted_rows:
+            if runs and runs[-1][0] + runs[-1][1] == row:
+                runs[-1][1] += 1
+            else:
+                runs.append([row, 1])
+
         model = self.model()
-        indexes = self.selectionModel().selectedIndexes()
-        for row in reversed(sorted(index.row() for index in indexes)):
-            model.removeRows(row)
+        for row, count in reversed(runs):
+            model.removeRows(row, count)
+        self._on_selection()  # removals do not emit selectionChanged
 
     def _reorder_rules(self, direction):
         """Move the selected rule(s) up or down."""
 
-        indexes = self.selectionModel().selectedIndexes()
-        rows = sorted(index.row() for index in indexes)
+        rows = self._sorted_rows
         if direction == 'up':
             self.model().moveRowsUp(rows[0], len(rows))
         else:
@@ -148,9 +165,7 @@ class _Delegate(QtGui.QItemDelegate):
     def sizeHint(self,            # pylint:disable=invalid-name
                  option, index):  # pylint:disable=unused-argument
         """Always return the same size."""
-        return self.sizeHint.SIZE
-
-    sizeHint.SIZE = QtCore.QSize(-1, 40)
+        return _ITEM_SIZE
 
 
 class _SubRuleDelegate(_Delegate):
@@ -166,15 +181,21 @@ class _SubRuleDelegate(_Delegate):
                      option, index):  # pylint:disable=W0613
         """Return a panel to change rule values."""
 
+        input_edit = QtGui.QLineEdit()
+        replace_edit = QtGui.QLineEdit()
+
         edits = QtGui.QHBoxLayout()
-        edits.addWidget(QtGui.QLineEdit())
+        edits.addWidget(input_edit)
         edits.addWidget(HTML("&nbsp;<strong>&rarr;</strong>&nbsp;"))
-        edits.addWidget(QtGui.QLineEdit())
+        edits.addWidget(replace_edit)
+
+        checkbox_widgets = [Checkbox(label) for label
+                            in ["regex", "case-insensitive", "unicode"]]
 
         checkboxes = QtGui.QHBoxLayout()
-        for label in ["regex", "case-insensitive", "unicode"]:
+        for checkbox in checkbox_widgets:
             checkboxes.addStretch()
-            checkboxes.addWidget(Checkbox(label))
+            checkboxes.addWidget(checkbox)
         checkboxes.addStretch()
 
         layout = QtGui.QVBoxLayout()
@@ -189,6 +210,10 @@ class _SubRuleDelegate(_Delegate):
         panel.setFocusPolicy(QtCore.Qt.StrongFocus)
         panel.setLayout(layout)
 
+        # kept on the panel so set*Data() need not call findChildren()
+        panel.atts_edits = input_edit, replace_edit
+        panel.atts_checkboxes = checkbox_widgets
+
         for layout in [edits, checkboxes, layout]:
             layout.setContentsMargins(0, 0, 0, 0)
             layout.setMargin(0)
@@ -204,11 +229,11 @@ class _SubRuleDelegate(_Delegate):
 
         rule = index.data(QtCore.Qt.EditRole)
 
-        edits = editor.findChildren(QtGui.QLineEdit)
+        edits = editor.atts_edits
         edits[0].setText(rule['input'])
         edits[1].setText(rule['replace'])
 
-        checkboxes = editor.findChildren(Checkbox)
+        checkboxes = editor.atts_checkboxes
         checkboxes[0].setChecked(rule['regex'])
         checkboxes[1].setChecked(rule['ignore_case'])
         checkboxes[2].setChecked(rule['unicode'])
@@ -218,32 +243,19 @@ class _SubRuleDelegate(_Delegate):
     def setModelData(self, editor, model, index):  # pylint:disable=C0103
         """Update the underlying model after edit."""
 
-        edits = editor.findChildren(QtGui.QLineEdit)
-        checkboxes = editor.findChildren(Checkbox)
+        edits = editor.atts_edits
+        checkboxes = editor.atts_checkboxes
         obj = {'input': edits[0].text(), 'compiled': None,
                'replace': edits[1].text(), 'regex': checkboxes[0].isChecked(),
                'ignore_case': checkboxes[1].isChecked(),
                'unicode': checkboxes[2].isChecked()}
 
-        input_len = len(obj['input'])
-        if input_len > 2 and obj['input'].startswith('/'):
-            input_ends = obj['input'].endswith
-            if input_ends('/'):
-                obj['input'] = obj['input'][1:-1]
-                obj['regex'] = True
-            elif input_len > 3:
-                if input_ends('/i'):
-                    obj['input'] = obj['input'][1:-2]
-                    obj['regex'] = True
-                    obj['ignore_case'] = True
-                elif input_ends('/g'):
-                    obj['input'] = obj['input'][1:-2]
-                    obj['regex'] = True
-                elif input_len > 4 and (input_ends('/ig') or
-                                        input_ends('/gi')):
-                    obj['input'] = obj['input'][1:-3]
-                    obj['regex'] = True
-                    obj['ignore_case'] = True
+        match = self.setModelData.RE_SLASH_WRAP.match(obj['input'])
+        if match:
+            obj['input'], flags = match.groups()
+            obj['regex'] = True
+            if flags and 'i' in flags:
+                obj['ignore_case'] = True
 
         try:
             obj['compiled'] = self._sul_compiler(obj)
@@ -252,8 +264,8 @@ class _SubRuleDelegate(_Delegate):
 
         if obj['compiled'] and obj['regex']:
             groups = obj['compiled'].groups
-            for group in self.setModelData.RE_SLASH.findall(obj['replace']):
-                group = int(group)
+            for match in self.setModelData.RE_SLASH.finditer(obj['replace']):
+                group = int(match.group(1))
                 if not group or group > groups:
                     obj['bad_replace'] = True
                     break
@@ -262,6 +274,10 @@ class _SubRuleDelegate(_Delegate):
 
     setModelData.RE_SLASH = re.compile(r'\\(\d+)')
 
+    # e.g. /pattern/, /pattern/i, /pattern/g, /pattern/ig, /pattern/gi
+    setModelData.RE_SLASH_WRAP = re.compile(r'/(.+)/(i|g|ig|gi)?\Z',
+                                            re.DOTALL)
+
 
 class _GroupPresetDelegate(_Delegate):
     """Item view specifically for a group preset."""
@@ -316,10 +332,7 @@ class _ListModel(QtCore.QAbstractListModel):  # pylint:disable=R0904
 
     def flags(self, index):  # pylint:disable=unused-argument
         """Always return same item flags."""
-        return self.flags.LIST_ITEM
-
-    flags.LIST_ITEM = (QtCore.Qt.ItemIsSelectable | QtCore.Qt.ItemIsEditable |
-                       QtCore.Qt.ItemIsEnabled)
+        return _ITEM_FLAGS
 
     def rowCount(self,          # pylint:disable=invalid-name
                  parent=None):  # pylint:disable=unused-argument
@@ -336,10 +349,9 @@ class _ListModel(QtCore.QAbstractListModel):  # pylint:disable=R0904
         parent = QtCore.QModelIndex()
         self.beginMoveRows(parent, row, row + count - 1,
                            parent, row + count + 1)
-        self.raw_data = (self.raw_data[0:row] +
-                         self.raw_data[row + count:row + count + 1] +
-                         self.raw_data[row:row + count] +
-                         self.raw_data[row + count + 1:])
+        raw_data = self.raw_data  # only the affected window is rewritten
+        raw_data[row:row + count + 1] = ([raw_data[row + count]] +
+                                         raw_data[row:row + count])
         self.endMoveRows()
         return True
 
@@ -348,10 +360,9 @@ class _ListModel(QtCore.QAbstractListModel):  # pylint:disable=R0904
 
         parent = QtCore.QModelIndex()
         self.beginMoveRows(parent, row, row + count - 1, parent, row - 1)
-        self.raw_data = (self.raw_data[0:row - 1] +
-                         self.raw_data[row:row + count] +
-                         self.raw_data[row - 1:row] +
-                         self.raw_data[row + count:])
+        raw_data = self.raw_data  # only the affected window is rewritten
+        raw_data[row - 1:row + count] = (raw_data[row:row + count] +
+                                         [raw_data[row - 1]])
         self.endMoveRows()
         return True
 
@@ -369,43 +380,84 @@ class _ListModel(QtCore.QAbstractListModel):  # pylint:disable=R0904
         """Update the new value into the raw list."""
 
         self.raw_data[index.row()] = value
+        self.dataChanged.emit(index, index)  # repaint just this row
         return True
 
 
 class _SubListModel(_ListModel):  # pylint:disable=R0904
     """Provides glue to/from the underlying substitution list."""
 
+    __slots__ = [
+        '_display_cache',  # rendered display text by row
+    ]
+
     def __init__(self, *args, **kwargs):
         super(_SubListModel, self).__init__(*args, **kwargs)
+        self._display_cache = {}
         self.raw_data = [dict(obj) for obj in self.raw_data]  # deep copy
 
+    def moveRowsDown(self, row, count):  # pylint:disable=C0103
+        """Moves the records down, forgetting all display text."""
+
+        self._display_cache.clear()
+        return super(_SubListModel, self).moveRowsDown(row, count)
+
+    def moveRowsUp(self, row, count):  # pylint:disable=C0103
+        """Moves the records up, forgetting all display text."""
+
+        self._display_cache.clear()
+        return super(_SubListModel, self).moveRowsUp(row, count)
+
+    def removeRows(self, row, count=1, parent=None):  # pylint:disable=C0103
+        """Removes the records, forgetting all display text."""
+
+        self._display_cache.clear()
+        return super(_SubListModel, self).removeRows(row, count, parent)
+
+    def setData(self, index, value,        # pylint:disable=C0103
+                role=QtCore.Qt.EditRole):
+        """Updates the record, forgetting its display text."""
+
+        self._display_cache.pop(index.row(), None)
+        return super(_SubListModel, self).setData(index, value, role)
+
     def data(self, index, role=QtCore.Qt.DisplayRole):
         """Return display or edit data for the indexed rule."""
 
         if role == QtCore.Qt.DisplayRole:
-            rule = self.raw_data[index.row()]
-            if not rule['input']:
-                return "empty match pattern"
-            elif not rule['compiled']:
-                return "invalid match pattern: " + rule['input']
-            elif 'bad_replace' in rule:
-                return "bad replacement string: " + rule['replace']
-
-            text = '/%s/%s' % (rule['input'],
-                               'i' if rule['ignore_case'] else '') \
-                   if rule['regex'] else '"%s"' % rule['input']
-            action = ('replace it with "%s"' % rule['replace']
-                      if rule['replace'] else "remove it")
-            attr = ", ".join([
-                "regex pattern" if rule['regex'] else "plain text",
-                "case-insensitive" if rule['ignore_case'] else "case matters",
-                "unicode enabled" if rule['unicode'] else "unicode disabled",
-            ])
-            return "match " + text + " and " + action + "\n(" + attr + ")"
+            row = index.row()
+            try:
+                return self._display_cache[row]
+            except KeyError:
+                text = self._display_cache[row] = \
+                    self._display_text(self.raw_data[row])
+                return text
 
         elif role == QtCore.Qt.EditRole:
             return self.raw_data[index.row()]
 
+    def _display_text(self, rule):
+        """Returns the description shown for the given rule."""
+
+        if not rule['input']:
+            return "empty match pattern"
+        elif not rule['compiled']:
+            return "invalid match pattern: " + rule['input']
+        elif 'bad_replace' in rule:
+            return "bad replacement string: " + rule['replace']
+
+        text = '/%s/%s' % (rule['input'],
+                           'i' if rule['ignore_case'] else '') \
+               if rule['regex'] else '"%s"' % rule['input']
+        action = ('replace it with "%s"' % rule['replace']
+                  if rule['replace'] else "remove it")
+        attr = ", ".join([
+            "regex pattern" if rule['regex'] else "plain text",
+            "case-insensitive" if rule['ignore_case'] else "case matters",
+            "unicode enabled" if rule['unicode'] else "unicode disabled",
+        ])
+        return "match " + text + " and " + action + "\n(" + attr + ")"
+
     def insertRow(self, row=None, parent=None):  # pylint:disable=C0103
         """Inserts a new row at the given position (default end)."""
 
@@ -413,6 +465,7 @@ class _SubListModel(_ListModel):  # pylint:disable=R0904
             row = len(self.raw_data)  # defaults to end
 
         self.beginInsertRows(parent or QtCore.QModelIndex(), row, row)
+        self._display_cache.clear()
         self.raw_data.insert(row, {'input': '', 'compiled': None,
                                    'replace': '', 'regex': False,
                                    'ignore_case': True, 'unicode': True})
@@ -26,7 +26,7 @@ alert windows. It also may have more visual components in the future.
 
 import re
 
-from BeautifulSoup import BeautifulSoup
+from BeautifulSoup import BeautifulSoup, NavigableString, SoupStrainer
 from PyQt4.QtCore import Qt
 
 from .common import key_event_combo
@@ -93,6 +93,11 @@ class Reviewer(object):
         re.IGNORECASE,
     )
 
+    RE_TTS_TAG = re.compile(r'<\s*tts\b', re.IGNORECASE)
+
+    # only <tts> elements (and their contents) get built into the tree
+    STRAINER_TTS = SoupStrainer('tts')
+
     __slots__ = [
         '_addon',
         '_alerts',
@@ -239,17 +244,19 @@ class Reviewer(object):
             else:
                 self._addon.logger.warn("State changed; not playing audio")
 
-        try:
-            tags = BeautifulTTS(html)('tts')
-        except ValueError:
-            if '<tts' in html:
+        # most cards have no <tts> tags at all, so skip the parser for them
+        if self.RE_TTS_TAG.search(html):
+            try:
+                tags = BeautifulTTS(html,
+                                    parseOnlyThese=self.STRAINER_TTS)('tts')
+            except ValueError:
                 self._alerts("The TTS cannot be played on this card because "
                              "the HTML cannot be parsed (is it valid?)")
-            return
+                return
 
-        for tag in tags:
-            self._play_html_tag(tag, from_template, playback_wrapper,
-                                parent, show_errors)
+            for tag in tags:
+                self._play_html_tag(tag, from_template, playback_wrapper,
+                                    parent, show_errors)
 
         for legacy in self.RE_LEGACY_TAGS.findall(html):
             self._play_html_legacy(legacy, from_template, playback_wrapper,
@@ -259,7 +266,13 @@ class Reviewer(object):
                        show_errors=True):
         """Helper method for _play_html()."""
 
-        text = from_template(unicode(tag))
+        # a tag holding only text need not be reserialized w/ its markup,
+        # which from_template() would just strip back off anyway; this is
+        # an exact type check, as comments, CDATA, etc. are subclasses
+        string = tag.string
+        text = from_template(unicode(string)
+                             if type(string) is NavigableString
+                             else unicode(tag))
         if not text:
             return
 
@@ -20,6 +20,7 @@
 Path and directory initialization
 """
 
+import errno
 import os
 import sys
 import tempfile
@@ -45,8 +46,11 @@ ADDON_IS_LINKED = os.path.islink(ADDON)
 BLANK = os.path.join(ADDON, 'blank.mp3')
 
 CACHE = os.path.join(ADDON, '.cache')
-if not os.path.isdir(CACHE):
-    os.mkdir(CACHE)
+try:
+    os.mkdir(CACHE)  # usually already exists; cheaper than stat + mkdir
+except OSError as os_error:
+    if os_error.errno != errno.EEXIST:
+        raise
 
 CONFIG = os.path.join(ADDON, 'config.db')
 
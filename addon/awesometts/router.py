@@ -20,13 +20,17 @@
 Dispatch management of available services
 """
 
+from collections import OrderedDict
+from functools import partial
 import os
 import os.path
 from random import shuffle
 import re
+from hashlib import sha1
 from httplib import IncompleteRead
 from socket import error as SocketError
 from time import time
+from traceback import format_exc
 from urllib2 import URLError
 
 from PyQt4 import QtCore, QtGui
@@ -36,10 +40,12 @@ from .service import Trait as BaseTrait
 __all__ = ['Router']
 
 
-_SIGNAL = QtCore.SIGNAL('awesomeTtsThreadDone')
-
 FAILURE_CACHE_SECS = 3600  # ignore/dump failures from cache after one hour
 
+PATH_MEMO_MAX = 4096  # start over if this many cache paths are remembered
+
+POOL_MIN_THREADS = 2  # service calls run concurrently on at least this many
+
 RE_MUSTACHE = re.compile(r'\{?\{\{(.+?)\}\}\}?')
 RE_UNSAFE = re.compile(r'[^\w\s()-]', re.UNICODE)
 RE_WHITESPACE = re.compile(r'[\0\s]+', re.UNICODE)
@@ -49,13 +55,29 @@ WINDOWS_RESERVED = ['com1', 'com2', 'com3', 'com4', 'com5', 'com6', 'com7',
                     'lpt5', 'lpt6', 'lpt7', 'lpt8', 'lpt9', 'nul', 'prn']
 
 
-def _prefixed(lines, prefix="!!! "):
-    """Take incoming `lines` and prefix each line with `prefix`."""
+class _Prefixed(object):  # pylint:disable=too-few-public-methods
+    """
+    Wraps incoming `lines` for logging, prefixing each line with
+    `prefix` only if and when the logger actually renders the message
+    (the add-on's default logger discards everything unrendered).
+    """
 
-    return "\n".join(
-        prefix + line
-        for line in (lines if isinstance(lines, list) else lines.split("\n"))
-    )
+    __slots__ = [
+        '_lines',   # list of lines or a newline-delimited string
+        '_prefix',  # string to put in front of each line
+    ]
+
+    def __init__(self, lines, prefix="!!! "):
+        self._lines = lines
+        self._prefix = prefix
+
+    def __str__(self):
+        lines = self._lines
+        return "\n".join(
+            self._prefix + line
+            for line in (lines if isinstance(lines, list)
+                         else lines.split("\n"))
+        )
 
 
 class Router(object):
@@ -74,11 +96,13 @@ class Router(object):
         """Raised for requests for files that are already underway."""
 
     __slots__ = [
-        '_busy',       # list of file paths that are in-progress
+        '_busy',       # in-progress file paths to waiting callers
+        '_by_trait',   # lookup of traits to sorted service names
         '_cache_dir',  # path for writing cached media files
         '_config',     # user configuration (dict-like)
         '_failures',   # lookup of file paths that raised exceptions
         '_logger',     # logger-like interface with debug(), info(), etc.
+        '_paths',      # memoized cache paths by service ID, text, options
         '_pool',       # instance of the _Pool class for managing threads
         '_services',   # bundle with dead services, aliases, avail, lookup
         '_temp_dir',   # path for writing human-readable filenames
@@ -120,11 +144,22 @@ class Router(object):
             for svc_id, svc_class in services.mappings
         }
 
-        self._busy = []
+        self._busy = {}
+
+        # registered services and their traits are fixed for the session,
+        # so this reverse index of the traits is built only once here
+        self._by_trait = {}
+        for service in services.lookup.values():
+            for trait in service['traits']:
+                self._by_trait.setdefault(trait, []).append(service['name'])
+        for names in self._by_trait.values():
+            names.sort(key=lambda name: name.lower())
+
         self._cache_dir = cache_dir
         self._config = config
         self._failures = {}
         self._logger = logger
+        self._paths = {}
         self._pool = _Pool(logger)
         self._services = services
         self._temp_dir = temp_dir
@@ -134,12 +169,7 @@ class Router(object):
         Returns a list of service names that advertise the given trait.
         """
 
-        return sorted([
-            service['name']
-            for service
-            in self._services.lookup.values()
-            if trait in service['traits']
-        ], key=lambda name: name.lower())
+        return list(self._by_trait.get(trait, ()))  # copy of the index
 
     def has_trait(self, svc_id, trait):
         """
@@ -248,7 +278,7 @@ class Router(object):
         self._failures = {}
 
     def group(self, text, group, presets, callbacks,
-              want_human=False, note=None):
+              want_human=False, note=None, join_busy=False):
         """
         Execute a group playback request using the passed group to be
         looked up using the passed presets.
@@ -260,6 +290,8 @@ class Router(object):
         how the caller wants the filename in the path to be formatted.
         Additionally, note may be passed to provide mustache values for
         the given template string.
+
+        The join_busy flag is passed through to each bare call.
         """
 
         self._call_assert_callbacks(callbacks)
@@ -329,12 +361,13 @@ class Router(object):
                     svc_id = preset.pop('service')
                     self(svc_id=svc_id, text=text, options=preset,
                          callbacks=internal_callbacks,
-                         want_human=want_human, note=note)
+                         want_human=want_human, note=note,
+                         join_busy=join_busy)
 
             try_next()
 
     def __call__(self, svc_id, text, options, callbacks,
-                 want_human=False, note=None):
+                 want_human=False, note=None, join_busy=False):
         """
         Given the service ID and associated options, pass the text into
         the service for processing.
@@ -379,6 +412,11 @@ class Router(object):
         how the caller wants the filename in the path to be formatted.
         Additionally, note may be passed to provide mustache values for
         the given template string.
+
+        If the file is already being generated by an earlier call, the
+        fail callback gets a BusyError (e.g. so that playback of it is
+        not queued twice), unless join_busy is set, in which case the
+        callbacks wait on and share the result of the earlier call.
         """
 
         self._call_assert_callbacks(callbacks)
@@ -394,8 +432,13 @@ class Router(object):
             text = service['instance'].modify(text)
             if not text:
                 raise ValueError("Text not usable by " + service['class'].NAME)
-            path = self._validate_path(svc_id, text, options)
-            cache_hit = os.path.exists(path)
+            path = self._path_cache(svc_id, text, options)
+            if path in self._busy and not join_busy:
+                raise self.BusyError(
+                    "The '%s' service is already busy processing %s." %
+                    (svc_id, path)
+                )
+            cache_hit = path not in self._busy and os.path.exists(path)
 
             self._logger.debug(
                 "Parsed call to '%s' w/ %s and \"%s\" at %s (cache %s)",
@@ -493,7 +536,11 @@ class Router(object):
 
             return new_path
 
-        if cache_hit:
+        if path in self._busy:
+            self._logger.debug("Waiting on the in-progress call for %s", path)
+            self._busy[path].append((callbacks, human))
+
+        elif cache_hit:
             if 'done' in callbacks:
                 callbacks['done']()
             callbacks['okay'](human(path))
@@ -509,57 +556,19 @@ class Router(object):
                 callbacks['then']()
 
         else:
-            def on_error(exception):
-                """
-                For Internet-based services, cache errors. Certain
-                exceptions are not cached, as they are usually network
-                or connectivity errors.
-
-                Afterward, pass exception to the fail handler.
-                """
-
-                if BaseTrait.INTERNET in service['class'].TRAITS and \
-                   not isinstance(exception, IncompleteRead) and \
-                   not isinstance(exception, SocketError) and \
-                   not isinstance(exception, URLError):
-                    self._failures[path] = time(), exception
-                callbacks['fail'](exception)
-
-            service['instance'].net_reset()
-            self._busy.append(path)
-
-            def completion_callback(exception):
-                """Intermediate callback handler for all service calls."""
-
-                self._busy.remove(path)
-
-                if 'done' in callbacks:
-                    callbacks['done']()
-
-                if 'miss' in callbacks:
-                    callbacks['miss'](svc_id, service['instance'].net_count())
-
-                if exception:
-                    on_error(exception)
-                elif os.path.exists(path):
-                    callbacks['okay'](human(path))
-                else:
-                    on_error(RuntimeError(
-                        "The %s service did not successfully write out an "
-                        "MP3." % service['name']
-                    ))
-
-                if 'then' in callbacks:
-                    callbacks['then']()
-
-            def do_spawn():
-                """Call if ready to start a thread to run the service."""
-                self._pool.spawn(
-                    task=lambda: service['instance'].run(text, options, path),
-                    callback=completion_callback,
-                )
+            instance = service['instance']
+            instance.net_reset()
+            self._busy[path] = [(callbacks, human)]
+
+            completion_callback = partial(self._on_call_done,
+                                          svc_id, service, path, callbacks)
+            do_spawn = partial(
+                self._pool.spawn,
+                task=partial(instance.run, text, options, path),
+                callback=completion_callback,
+            )
 
-            if hasattr(service['instance'], 'prerun'):
+            if hasattr(instance, 'prerun'):
                 def prerun_ok(result):
                     """Callback handler for successful prerun hook."""
                     options['prerun'] = result
@@ -572,8 +581,8 @@ class Router(object):
                     completion_callback(exception)
 
                 try:
-                    service['instance'].prerun(text, options, path,
-                                               prerun_ok, prerun_error)
+                    instance.prerun(text, options, path,
+                                    prerun_ok, prerun_error)
                 except Exception as exception:  # all, pylint:disable=W0703
                     self._logger.error("Synchronous exception in prerun: %s",
                                        exception)
@@ -581,6 +590,55 @@ class Router(object):
             else:
                 do_spawn()
 
+    def _on_call_done(self, svc_id, service, path, callbacks, exception):
+        """
+        Intermediate callback handler for all service calls, fanning the
+        result out to the calling callbacks and to any others that
+        requested the same path while it was in-progress.
+
+        For Internet-based services, errors are also cached. Certain
+        exceptions are not cached, as they are usually network or
+        connectivity errors.
+        """
+
+        if not exception and not os.path.exists(path):
+            exception = RuntimeError(
+                "The %s service did not successfully write out an MP3." %
+                service['name']
+            )
+
+        if exception and \
+           BaseTrait.INTERNET in service['class'].TRAITS and \
+           not isinstance(exception, IncompleteRead) and \
+           not isinstance(exception, SocketError) and \
+           not isinstance(exception, URLError):
+            self._failures[path] = time(), exception
+
+        # one waiter's failing callback (e.g. human() being unable to copy
+        # the file) must not keep the remaining waiters from hearing back
+        for waiter_callbacks, waiter_human in self._busy.pop(path):
+            try:
+                if 'done' in waiter_callbacks:
+                    waiter_callbacks['done']()
+
+                if waiter_callbacks is callbacks and 'miss' in callbacks:
+                    callbacks['miss'](svc_id,
+                                      service['instance'].net_count())
+
+                if exception:
+                    waiter_callbacks['fail'](exception)
+                else:
+                    waiter_callbacks['okay'](waiter_human(path))
+
+                if 'then' in waiter_callbacks:
+                    waiter_callbacks['then']()
+
+            except Exception:  # catch all, pylint:disable=W0703
+                self._logger.error(
+                    "Exception in callbacks for %s\n%s",
+                    path, _Prefixed(format_exc()),
+                )
+
     def _call_assert_callbacks(self, callbacks):
         """Checks the callbacks argument for validity."""
 
@@ -598,36 +656,41 @@ class Router(object):
             - 0th: normalized service ID
             - 1st: service lookup dict
             - 2nd: normalized text
-            - 3rd: options, normalized and defaults filled in
+            - 3rd: options, normalized and defaults filled in, ordered
+                   by key so that the cache path can be built from
+                   them without sorting again
             - 4th: cache path
         """
 
         svc_id, service = self._fetch_options_and_extras(svc_id)
         svc_options = service['options']
-        svc_options_keys = [svc_option['key'] for svc_option in svc_options]
+        svc_options_keys = service['options_keys']
 
+        normalize = self._services.normalize
         options = {
             key: value
-            for key, value in [
-                (self._services.normalize(key), value)
-                for key, value in options.items()
-            ]
+            for key, value in (
+                (normalize(key), value)
+                for key, value in options.iteritems()
+            )
             if key in svc_options_keys
         }
 
-        problems = self._validate_options(options, svc_options)
+        problems = self._validate_options(options, svc_options,
+                                          service['options_allowed'])
         if problems:
             raise ValueError(
                 "Running the '%s' (%s) service failed: %s." %
                 (svc_id, service['name'], "; ".join(problems))
             )
 
-        return svc_id, service, options
+        return svc_id, service, OrderedDict(sorted(options.items()))
 
-    def _validate_options(self, options, svc_options):
+    def _validate_options(self, options, svc_options, svc_allowed):
         """
         Attempt to normalize and validate the passed options in-place,
-        given the official svc_options.
+        given the official svc_options and the svc_allowed sets that
+        were built alongside them for list-style options.
 
         Returns a list of problems, if any.
         """
@@ -642,7 +705,8 @@ class Router(object):
                     # transform is inside try as it might throw a ValueError
                     transformed_value = svc_option['transform'](options[key])
 
-                    if isinstance(svc_option['values'], tuple):
+                    allowed = svc_allowed.get(key)
+                    if allowed is None:  # tuple w/ range
                         if transformed_value < svc_option['values'][0] or \
                            transformed_value > svc_option['values'][1]:
                             raise ValueError("outside of %d..%d" % (
@@ -650,12 +714,15 @@ class Router(object):
                                 svc_option['values'][1],
                             ))
 
-                    else:  # list of tuples
-                        next(
-                            True
-                            for item in svc_option['values']
-                            if item[0] == transformed_value
+                    elif transformed_value not in allowed:
+                        problems.append(
+                            "'%s' is not an option for '%s' attribute "
+                            "(try %s)" % (
+                                options[key], key,
+                                ", ".join(v[0] for v in svc_option['values']),
+                            )
                         )
+                        continue
 
                     options[key] = transformed_value
 
@@ -665,15 +732,6 @@ class Router(object):
                         (options[key], key, exception.message)
                     )
 
-                except StopIteration:
-                    problems.append(
-                        "'%s' is not an option for '%s' attribute (try %s)" %
-                        (
-                            options[key], key,
-                            ", ".join(v[0] for v in svc_option['values']),
-                        )
-                    )
-
             elif 'default' in svc_option:
                 options[key] = svc_option['default']
 
@@ -688,22 +746,6 @@ class Router(object):
 
         return problems
 
-    def _validate_path(self, svc_id, text, options):
-        """
-        Given the service ID, its associated options, and the desired
-        text, generate a cache path. If the file is already being
-        processed, raise a BusyError.
-        """
-
-        path = self._path_cache(svc_id, text, options)
-        if path in self._busy:
-            raise self.BusyError(
-                "The '%s' service is already busy processing %s." %
-                (svc_id, path)
-            )
-
-        return path
-
     def _fetch_options_and_extras(self, svc_id):
         """
         Identifies the service by its ID, checks to see if the options
@@ -754,6 +796,18 @@ class Router(object):
 
                 service['options'].append(option)
 
+            service['options_keys'] = frozenset(option['key']
+                                                for option
+                                                in service['options'])
+
+            # for list-style options, the accepted values as a set, so
+            # validation is a membership test rather than a linear scan
+            service['options_allowed'] = {
+                option['key']: frozenset(item[0] for item in option['values'])
+                for option in service['options']
+                if isinstance(option['values'], list)
+            }
+
         if 'extras' not in service:  # extras are like options, but universal
             service['extras'] = []
 
@@ -788,15 +842,18 @@ class Router(object):
         given service is not available for this session.
         """
 
-        svc_id = self._services.normalize(svc_id)
-        if svc_id in self._services.aliases:
-            svc_id = self._services.aliases[svc_id]
+        services = self._services
+
+        svc_id = services.normalize(svc_id)
+        aliases = services.aliases
+        if svc_id in aliases:
+            svc_id = aliases[svc_id]
 
         try:
-            service = self._services.lookup[svc_id]
+            service = services.lookup[svc_id]
         except KeyError:
             raise ValueError(
-                self._services.dead[svc_id] if svc_id in self._services.dead
+                services.dead[svc_id] if svc_id in services.dead
                 else "There is no '%s' service" % svc_id
             )
 
@@ -834,38 +891,64 @@ class Router(object):
         except Exception:  # catch all, pylint:disable=W0703
             service['instance'] = None  # flag this service as unavailable
 
-            from traceback import format_exc
             self._logger.warn(
                 "Initialization failed for %s service\n%s",
-                service['name'], _prefixed(format_exc()),
+                service['name'], _Prefixed(format_exc()),
             )
 
     def _path_cache(self, svc_id, text, options):
         """
         Returns a consistent cache path given the svc_id, text, and
         options. This can be used to repeat the same request yet reuse
-        the same path.
-        """
-
-        hash_input = '/'.join([
-            text,
-            svc_id,
-            ';'.join(
-                '='.join([
-                    key,
-                    value if isinstance(value, basestring) else str(value),
-                ])
-                for key, value
-                in sorted(options.items())
-            )
-        ])
+        the same path. The options must already be ordered by key, as
+        returned from _validate_service().
 
-        from hashlib import sha1
+        Paths are remembered, so repeating a request (e.g. replaying a
+        card) skips rebuilding and rehashing the input.
+        """
 
-        hex_digest = sha1(
-            hash_input.encode('utf-8') if isinstance(hash_input, unicode)
-            else hash_input
-        ).hexdigest().lower()
+        options = tuple(
+            (key, value if isinstance(value, basestring) else str(value))
+            for key, value
+            in options.iteritems()
+        )
+
+        try:
+            return self._paths[svc_id, text, options]
+        except KeyError:
+            if len(self._paths) >= PATH_MEMO_MAX:
+                self._paths.clear()
+            path = self._paths[svc_id, text, options] = \
+                self._path_digest(svc_id, text, options)
+            return path
+
+    def _path_digest(self, svc_id, text, options):
+        """
+        Hashes the svc_id, text, and options (a sorted sequence of
+        key-string pairs) into a cache path.
+
+        The (potentially long) text is fed to the hash separately from
+        the short service ID and options suffix, rather than first being
+        copied into one joined string.
+        """
+
+        digest = sha1()
+
+        for fragment in [
+                text,
+                '/'.join([
+                    '',
+                    svc_id,
+                    ';'.join('='.join(option) for option in options),
+                ]),
+        ]:
+            try:
+                fragment = fragment.encode('utf-8')
+            except UnicodeDecodeError:  # already a non-ASCII bytestring
+                pass
+            digest.update(fragment)
+
+        hex_digest = digest.hexdigest().lower()
 
         assert len(hex_digest) == 40, "unexpected output from hash library"
         return os.path.join(
@@ -882,48 +965,60 @@ class Router(object):
 
 class _Pool(QtGui.QWidget):
     """
-    Managers a pool of worker threads to keep the UI responsive.
+    Manages a bounded pool of worker threads to keep the UI responsive.
+
+    Tasks are queued onto a QThreadPool, so that a large batch does not
+    start one thread per request. Each worker relays its completion
+    back through this object, which lives on the main thread.
     """
 
+    # emitted by workers with their task ID, exception, and stack trace
+    task_done = QtCore.pyqtSignal(int, object, object)
+
     __slots__ = [
+        '_callbacks',   # dict of IDs mapping to callbacks in Router
         '_current_id',  # the last/current worker ID in-use
         '_logger',      # for writing messages about threads
-        '_threads',     # dict of IDs mapping workers and callbacks in Router
+        '_qpool',       # QThreadPool that runs and reuses the threads
     ]
 
     def __init__(self, logger, *args, **kwargs):
         """
-        Initialize my internal state (next ID and lookup pools for the
-        callbacks and workers).
+        Initialize my internal state (next ID, lookup for the callbacks,
+        and the thread pool itself).
         """
 
         super(_Pool, self).__init__(*args, **kwargs)
 
+        self._callbacks = {}
         self._current_id = 0
         self._logger = logger
-        self._threads = {}
+
+        self._qpool = QtCore.QThreadPool(self)
+        self._qpool.setMaxThreadCount(max(POOL_MIN_THREADS,
+                                          QtCore.QThread.idealThreadCount()))
+
+        # workers emit this from their own threads; Qt queues delivery
+        # so that the slot (and thus the Router callback) runs here
+        self.task_done.connect(self._on_worker_signal,
+                               QtCore.Qt.QueuedConnection)
 
     def spawn(self, task, callback):
         """
-        Create a worker thread for the given task. When the thread
-        completes, the callback will be called.
+        Queue a worker for the given task. When the task completes, the
+        callback will be called on the main thread.
         """
 
         self._current_id += 1
-        thread = self._threads[self._current_id] = {
-            # keeping a reference to worker prevents garbage collection
-            'callback': callback,
-            'done': False,
-            'worker': _Worker(self._current_id, task),
-        }
+        self._callbacks[self._current_id] = callback
 
-        self.connect(thread['worker'], _SIGNAL, self._on_worker_signal)
-        thread['worker'].finished.connect(self._on_worker_finished)
-        thread['worker'].start()
+        # n.b. with autoDelete on (the default), PyQt hands ownership of
+        # the worker to the pool, which deletes it once run() returns
+        self._qpool.start(_Worker(self._current_id, task, self))
 
         self._logger.debug(
-            "Spawned thread [%d]; pool=%s",
-            self._current_id, self._threads,
+            "Queued task [%d]; pending=%s",
+            self._current_id, sorted(self._callbacks.keys()),
         )
 
     def _on_worker_signal(self, thread_id, exception=None, stack_trace=None):
@@ -940,67 +1035,44 @@ class _Pool(QtGui.QWidget):
                     "No additional details available"
 
             self._logger.debug(
-                "Exception from thread [%d] (%s); executing callback\n%s",
+                "Exception from task [%d] (%s); executing callback\n%s",
 
                 thread_id, exception.message,
 
-                _prefixed(stack_trace)
+                _Prefixed(stack_trace)
                 if isinstance(stack_trace, basestring)
                 else "Stack trace unavailable",
             )
 
         else:
             self._logger.debug(
-                "Completion from thread [%d]; executing callback",
+                "Completion from task [%d]; executing callback",
                 thread_id,
             )
 
-        self._threads[thread_id]['callback'](exception)
-        self._threads[thread_id]['done'] = True
-
-    def _on_worker_finished(self):
-        """
-        When the worker is finished, which happens sometime briefly
-        after it's done with its task, delete it from the thread pool if
-        its callback has already executed.
-        """
-
-        thread_ids = [
-            thread_id
-            for thread_id, thread in self._threads.items()
-            if thread['done'] and thread['worker'].isFinished()
-        ]
-
-        if not thread_ids:
-            return
-
-        for thread_id in thread_ids:
-            del self._threads[thread_id]
-
-        self._logger.debug(
-            "Reaped thread%s %s; pool=%s",
-            "s" if len(thread_ids) != 1 else "", thread_ids, self._threads,
-        )
+        self._callbacks.pop(thread_id)(exception)
 
 
-class _Worker(QtCore.QThread):
+class _Worker(QtCore.QRunnable):
     """
     Generic worker for running processes in the background.
     """
 
     __slots__ = [
-        '_thread_id',  # my thread ID; used to communicate back to main thread
-        '_task',       # the task I will need to call when run
+        '_id',     # my task ID; used to communicate back to main thread
+        '_relay',  # object on the main thread whose signal I emit
+        '_task',   # the task I will need to call when run
     ]
 
-    def __init__(self, thread_id, task):
+    def __init__(self, thread_id, task, relay):
         """
-        Save my worker ID and task.
+        Save my worker ID, task, and relay.
         """
 
         super(_Worker, self).__init__()
 
         self._id = thread_id
+        self._relay = relay
         self._task = task
 
     def run(self):
@@ -1012,8 +1084,7 @@ class _Worker(QtCore.QThread):
         try:
             self._task()
         except Exception as exception:  # catch all, pylint:disable=W0703
-            from traceback import format_exc
-            self.emit(_SIGNAL, self._id, exception, format_exc())
+            self._relay.task_done.emit(self._id, exception, format_exc())
             return
 
-        self.emit(_SIGNAL, self._id)
+        self._relay.task_done.emit(self._id, None, None)
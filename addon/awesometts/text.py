@@ -242,16 +242,28 @@ class Sanitizer(object):  # call only, pylint:disable=too-few-public-methods
         Upon encountering text that matches one of the user's compiled
         rules, make a replacement. Run whitespace and ellipsis rules
         before each one.
+
+        Once those rules leave the text as-is, they need not run again
+        until a user rule actually substitutes something. They are not
+        skipped merely after having run, as they are not idempotent for
+        all inputs (e.g. when NUL characters are involved).
         """
 
-        for rule in rules:
-            text = self._rule_whitespace(self._rule_ellipses(text))
-            if not text:
-                return ''
+        settled = False
 
-            text = rule['compiled'].sub(rule['replace'], text)
+        for rule in rules:
+            if not settled:
+                normalized = self._rule_whitespace(self._rule_ellipses(text))
+                settled = normalized == text
+                text = normalized
+                if not text:
+                    return ''
+
+            text, count = rule['compiled'].subn(rule['replace'], text)
             if not text:
                 return ''
+            if count:
+                settled = False
 
         return text
 
@@ -297,10 +309,23 @@ class Sanitizer(object):  # call only, pylint:disable=too-few-public-methods
     def _rule_html(self, text):
         """
         Removes any HTML, including converting character entities.
+
+        As the same fragments are often stripped more than once (e.g. a
+        question side that is embedded in its answer side), results are
+        memoized for recently-seen inputs.
         """
 
-        text = RE_LINEBREAK_HTML.sub(' ', text)
-        return STRIP_HTML(text)
+        memo = self._rule_html.memo
+        try:
+            return memo[text]
+        except KeyError:
+            if len(memo) >= self._rule_html.MEMO_MAX:
+                memo.clear()
+            result = memo[text] = STRIP_HTML(RE_LINEBREAK_HTML.sub(' ', text))
+            return result
+
+    _rule_html.memo = {}  # shared by all instances, as stripping is pure
+    _rule_html.MEMO_MAX = 128
 
     def _rule_newline_ellipsize(self, text):
         """